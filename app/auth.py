@@ -1,34 +1,108 @@
+import bcrypt
 import jwt
+import orjson
 import os
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
 from .logger import logger
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-this")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRY_HOURS = 24
+BCRYPT_ROUNDS = 12
+
+class _OrjsonJWT(jwt.PyJWT):
+    """PyJWT that parses the claims payload with orjson instead of stdlib json."""
+
+    def _decode_payload(self, decoded: dict) -> dict:
+        try:
+            payload = orjson.loads(decoded["payload"])
+        except orjson.JSONDecodeError as e:
+            raise jwt.DecodeError(f"Invalid payload string: {e}")
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+        return payload
+
+# Reused across calls instead of going through the module-level jwt API
+_JWT = _OrjsonJWT()
+_JWS_ALGS = [JWT_ALGORITHM]
+_DECODE_OPTS = {"require": ["exp", "iat", "uid"]}
+
+# Decoded payloads keyed by a 16-byte blake2b digest of the token (raw tokens are never stored)
+_TOKEN_CACHE = TTLCache(maxsize=10000, ttl=30)
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+# Successful bcrypt checks, keyed by blake2b(password) keyed with the stored hash; failures
+# are never cached so guessing still pays the full bcrypt cost
+_PASSWORD_CACHE = TTLCache(maxsize=1024, ttl=300)
+_PASSWORD_CACHE_LOCK = threading.Lock()
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
 
 def create_token(uid: str, email: str, role: str) -> str:
     """Create a JWT token for a user."""
+    now = datetime.now(timezone.utc)
     payload = {
         "uid": uid,
         "email": email,
         "role": role,
-        "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRY_HOURS),
-        "iat": datetime.utcnow()
+        "exp": now + timedelta(hours=JWT_EXPIRY_HOURS),
+        "iat": now
     }
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    logger.info(f"Token created for user: {uid}")
+    token = _JWT.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    logger.info("Token created for user: %s", uid)
     return token
 
+def hash_password(password: str) -> str:
+    """Hash a password with bcrypt."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+def verify_password(password: str, user: dict) -> bool:
+    """Check a password against the user's bcrypt hash, falling back to a legacy plain-text password."""
+    password_hash = user.get("password_hash")
+    if not password_hash:
+        return hmac.compare_digest(password.encode(), user.get("password", "").encode())
+
+    key = hashlib.blake2b(password.encode(), digest_size=16, key=password_hash.encode()).digest()
+    with _PASSWORD_CACHE_LOCK:
+        if key in _PASSWORD_CACHE:
+            return True
+
+    if not bcrypt.checkpw(password.encode(), password_hash.encode()):
+        return False
+    with _PASSWORD_CACHE_LOCK:
+        _PASSWORD_CACHE[key] = True
+    return True
+
+def get_cached_payload(token: str) -> dict:
+    """Return the cached decoded payload for a token, or None if not cached or expired."""
+    with _TOKEN_CACHE_LOCK:
+        cached = _TOKEN_CACHE.get(_token_key(token))
+    if cached and cached.get("exp", 0) > time.time():
+        return cached
+    return None
+
 def verify_token(token: str) -> dict:
     """Verify JWT token and return decoded payload."""
+    cached = get_cached_payload(token)
+    if cached:
+        return cached
+
+    key = _token_key(token)
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        logger.info(f"Token verified for user: {decoded.get('uid')}")
+        decoded = _JWT.decode(token, JWT_SECRET, algorithms=_JWS_ALGS, options=_DECODE_OPTS)
+        logger.info("Token verified for user: %s", decoded.get('uid'))
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE[key] = decoded
         return decoded
     except jwt.ExpiredSignatureError:
         logger.error("Token expired")
         return None
     except jwt.InvalidTokenError as e:
-        logger.error(f"Token verification failed: {e}")
+        logger.error("Token verification failed: %s", e)
         return None
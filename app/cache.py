@@ -0,0 +1,89 @@
+import os
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from .db import get_db
+from .logger import logger
+
+REDIS_URL = os.getenv("REDIS_URL")
+# Short, so a stale copy re-cached by a read racing a write expires quickly
+USER_CACHE_TTL = 60
+USERS_SNAPSHOT_KEY = "users:all:v1"
+
+# Non-secret user fields read by auth and task templates; credentials are never fetched or cached
+USER_PROJECTION = {
+    "_id": 0,
+    "uid": 1,
+    "email": 1,
+    "name": 1,
+    "role": 1,
+    "assign_website": 1,
+    "task_assign_no": 1,
+    "other_tasks": 1,
+}
+
+# Optional: without REDIS_URL every lookup goes straight to MongoDB
+redis = Redis.from_url(REDIS_URL) if REDIS_URL else None
+
+def _uid_key(uid: str) -> str:
+    return f"user:uid:{uid}"
+
+async def get_user_cached(uid: str):
+    """Get a user document by uid through the Redis cache, falling back to MongoDB."""
+    key = _uid_key(uid)
+    if redis is not None:
+        try:
+            cached = await redis.get(key)
+            if cached is not None:
+                return orjson.loads(cached)
+        except RedisError as e:
+            logger.warning("Redis read failed for %s: %s", key, e)
+
+    user = await get_db().users.find_one({"uid": uid}, USER_PROJECTION)
+
+    if user and redis is not None:
+        try:
+            await redis.setex(key, USER_CACHE_TTL, orjson.dumps(user))
+        except RedisError as e:
+            logger.warning("Redis write failed for %s: %s", key, e)
+    return user
+
+async def get_users_snapshot():
+    """Get the pre-serialized admin users list, or None if it isn't cached."""
+    if redis is None:
+        return None
+    try:
+        return await redis.get(USERS_SNAPSHOT_KEY)
+    except RedisError as e:
+        logger.warning("Redis read failed for %s: %s", USERS_SNAPSHOT_KEY, e)
+        return None
+
+async def set_users_snapshot(payload: bytes):
+    """Store the serialized admin users list; dropped when a user changes, with a TTL as a backstop."""
+    if redis is None:
+        return
+    try:
+        # A query that raced a user change can store a stale list after its DEL; the TTL bounds that
+        await redis.setex(USERS_SNAPSHOT_KEY, USER_CACHE_TTL, payload)
+    except RedisError as e:
+        logger.warning("Redis write failed for %s: %s", USERS_SNAPSHOT_KEY, e)
+
+async def invalidate_users_snapshot():
+    """Drop the users list snapshot, e.g. after a user is added."""
+    if redis is None:
+        return
+
+    try:
+        await redis.delete(USERS_SNAPSHOT_KEY)
+    except RedisError as e:
+        logger.warning("Redis invalidation failed for %s: %s", USERS_SNAPSHOT_KEY, e)
+
+async def invalidate_user_cache(uid: str):
+    """Drop the cached copy of a user document, and the users list snapshot."""
+    if redis is None:
+        return
+
+    try:
+        await redis.delete(_uid_key(uid), USERS_SNAPSHOT_KEY)
+    except RedisError as e:
+        logger.warning("Redis invalidation failed for user %s: %s", uid, e)
@@ -1,5 +1,7 @@
 import os
-from pymongo import MongoClient
+import functools
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
 from dotenv import load_dotenv
 from .logger import logger
 
@@ -7,18 +9,64 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 
-try:
-    if not MONGO_URI:
-        logger.error("MONGO_URI not found in environment variables")
-        raise ValueError("MONGO_URI not found")
+# Bump when the index set below changes so existing deployments rebuild it
+INDEXES_VERSION = 2
+
+@functools.lru_cache(maxsize=1)
+def get_db():
+    """Create the MongoDB client on first use and return the default database."""
+    try:
+        if not MONGO_URI:
+            logger.error("MONGO_URI not found in environment variables")
+            raise ValueError("MONGO_URI not found")
+            
+        client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=200,
+            minPoolSize=10,
+            maxIdleTimeMS=300_000,
+            serverSelectionTimeoutMS=5000,
+            retryWrites=True,
+            compressors="zstd",
+        )
+        db = client.get_database() # Connect to the default database in URI
         
-    client = MongoClient(MONGO_URI)
-    db = client.get_database() # Connect to the default database in URI
-    
-    # Create index
-    db.tasks.create_index([("user_id", 1), ("date", 1)], unique=True)
-    
-    logger.info("MongoDB connected and index created")
-except Exception as e:
-    logger.error(f"MongoDB connection failed: {e}")
-    raise e
+        logger.info("MongoDB client initialized")
+        return db
+    except Exception as e:
+        logger.error("MongoDB connection failed: %s", e)
+        raise e
+
+_indexes_ensured = False
+
+async def ensure_indexes():
+    """Create collection indexes once per process, skipping it if another worker already has."""
+    global _indexes_ensured
+    if _indexes_ensured:
+        return
+
+    db = get_db()
+    meta = await db.meta.find_one({"_id": "indexes"})
+    if not meta or meta.get("v", 0) < INDEXES_VERSION:
+        indexes = (
+            (db.tasks, [("user_id", 1), ("date", 1)]),
+            (db.users, [("uid", 1)]),
+            (db.users, [("email", 1)]),
+        )
+        failed = 0
+        for collection, keys in indexes:
+            try:
+                await collection.create_index(keys, unique=True)
+            except PyMongoError as e:
+                # Existing duplicates make a unique build fail; keep serving and leave the
+                # version unset so the build is retried once the data is cleaned up
+                failed += 1
+                logger.error("Index %s on %s not created: %s", keys, collection.name, e)
+
+        if failed:
+            logger.error("%d MongoDB index(es) missing, fix duplicate data and restart", failed)
+        else:
+            await db.meta.update_one({"_id": "indexes"}, {"$set": {"v": INDEXES_VERSION}}, upsert=True)
+            logger.info("MongoDB indexes created")
+
+    _indexes_ensured = True
@@ -1,17 +1,35 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from .auth import verify_token
-from .db import db
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from cachetools import TTLCache
+from .auth import get_cached_payload, verify_token
+from .cache import get_user_cached, invalidate_user_cache
 from .logger import logger
 
-security = HTTPBearer()
+# Sanitized user documents keyed by uid, to skip the users lookup on repeat requests
+_USER_CACHE = TTLCache(maxsize=5000, ttl=30)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def invalidate_user(uid: str):
+    """Drops a user from the auth and Redis caches so the next request re-reads it from MongoDB."""
+    _USER_CACHE.pop(uid, None)
+    await invalidate_user_cache(uid)
+
+async def bearer_token(request: Request) -> str:
+    """Extracts the raw token from an 'Authorization: Bearer <token>' header."""
+    auth = request.headers.get("authorization")
+    if not auth or auth[:7].lower() != "bearer ":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return auth[7:]
+
+async def get_current_user(token: str = Depends(bearer_token)):
     """
     Verifies JWT token, checks if user exists in MongoDB, and returns user document.
     """
-    token = credentials.credentials
-    decoded_token = verify_token(token)
+    # Warm tokens are a cache lookup; only a real decode goes to the threadpool
+    decoded_token = get_cached_payload(token) or await run_in_threadpool(verify_token, token)
     
     if not decoded_token:
          raise HTTPException(
@@ -21,10 +39,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
         
     uid = decoded_token.get("uid")
-    user = db.users.find_one({"uid": uid})
+    user = _USER_CACHE.get(uid)
+    if user is None:
+        user = await get_user_cached(uid)
+        if user:
+            _USER_CACHE[uid] = user
     
     if not user:
-        logger.warning(f"Token valid but user NOT found in MongoDB: {uid}")
+        logger.warning("Token valid but user NOT found in MongoDB: %s", uid)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found in database",
@@ -40,7 +62,7 @@ async def require_user(user: dict = Depends(get_current_user)):
     """Allows 'user' or 'admin' roles."""
     role = user.get("role")
     if role not in ["user", "admin"]:
-        logger.warning(f"Access denied for user {user.get('uid')} with role {role}")
+        logger.warning("Access denied for user %s with role %s", user.get('uid'), role)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions",
@@ -51,7 +73,7 @@ async def require_admin(user: dict = Depends(get_current_user)):
     """Allows only 'admin' role."""
     role = user.get("role")
     if role != "admin":
-        logger.warning(f"Admin access denied for user {user.get('uid')} with role {role}")
+        logger.warning("Admin access denied for user %s with role %s", user.get('uid'), role)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required",
@@ -5,18 +5,23 @@ import sys
 logger = logging.getLogger("backend_logger")
 logger.setLevel(logging.INFO)
 
-# Create console handler and set level to debug
-ch = logging.StreamHandler(sys.stdout)
-ch.setLevel(logging.INFO)
+# Don't also emit through the root logger's handlers
+logger.propagate = False
 
-# Create formatter
-formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+# Only attach the handler once, so reloads don't duplicate every record
+if not logger.handlers:
+    # Create console handler and set level to debug
+    ch = logging.StreamHandler(sys.stdout)
+    ch.setLevel(logging.INFO)
 
-# Add formatter to ch
-ch.setFormatter(formatter)
+    # Create formatter (raw epoch timestamp; human-readable time is left to the log shipper)
+    formatter = logging.Formatter('%(created)f | %(levelname)s | %(message)s', style='%')
 
-# Add ch to logger
-logger.addHandler(ch)
+    # Add formatter to ch
+    ch.setFormatter(formatter)
+
+    # Add ch to logger
+    logger.addHandler(ch)
 
 # Start log
 logger.info("Logger initialized")
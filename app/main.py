@@ -1,20 +1,23 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .routes import router
 from .logger import logger
-from .db import db # Initialize DB connection
+from .db import get_db, ensure_indexes
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
-# CORS
-origins = ["*"]
+# CORS (comma-separated list of allowed frontend origins)
+origins = [o.strip() for o in os.getenv("FRONTEND_ORIGIN", "http://localhost:3000").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
 
 app.include_router(router)
@@ -26,6 +29,9 @@ def read_root():
 
 @app.on_event("startup")
 async def startup_event():
+    # Connect and build indexes per worker at startup rather than at import time
+    get_db()
+    await ensure_indexes()
     logger.info("Server started")
 
 if __name__ == "__main__":
@@ -1,23 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from datetime import datetime, date, timezone
 from typing import List, Optional
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import orjson
+import functools
+from types import MappingProxyType
+import time
 import uuid
 
 from .logger import logger
-from .deps import get_current_user, require_user, require_admin
-from .db import db
-from .schemas import TaskSave, TaskResponse
-from .auth import create_token
+from .deps import get_current_user, require_user, require_admin, invalidate_user
+from .db import get_db
+from .cache import get_user_cached, get_users_snapshot, set_users_snapshot, invalidate_users_snapshot
+from .write_batcher import WriteBatcher
+from .schemas import TaskSave, TaskResponse, LoginIn, CreateUserIn, ResetPasswordIn, AdminTaskUpdateIn
+from .auth import create_token, hash_password, verify_password
 
 router = APIRouter()
 
+# Concurrent task saves are coalesced into bulk upserts
+task_writes = WriteBatcher(lambda: get_db().tasks)
+
+# Task fields an admin edit also saves onto the user, as defaults for future days
+PERSIST_FIELDS = ("assign_website", "task_assign_no", "other_tasks")
+
+# Field defaults for a task an admin creates (read-only, overlaid per request)
+NEW_TASK_DEFAULTS = MappingProxyType({
+    "status": "Not Started",
+    "assign_website": "",
+    "task_assign_no": "",
+    "other_tasks": "",
+    "task_updates": "",
+    "additional": "",
+    "note": "",
+    "total_pages_done": 0,
+})
+
+# User fields login needs, credentials included; only ever read straight from MongoDB
+LOGIN_PROJECTION = {
+    "_id": 0,
+    "uid": 1,
+    "email": 1,
+    "name": 1,
+    "role": 1,
+    "password": 1,
+    "password_hash": 1,
+}
+
+# Task documents are returned whole minus _id: admin updates may store extra fields
+# (AdminTaskUpdateIn allows them), so an inclusion list would hide them on read
+TASK_PROJECTION = {"_id": 0}
+
 # --- Utility ---
+_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+@functools.lru_cache(maxsize=1)
+def _date_str_for_epoch_day(day: int) -> str:
+    return date.fromordinal(_EPOCH_ORDINAL + day).isoformat()
+
 def get_today_str():
-    return datetime.utcnow().strftime("%Y-%m-%d")
+    # Cached per UTC day, so the string only gets rebuilt once at midnight
+    return _date_str_for_epoch_day(int(time.time() // 86400))
 
-def get_day_name(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%d").strftime("%A")
+@functools.lru_cache(maxsize=4096)
+def get_day_name(date_str: str) -> str:
+    return _DAYS[date.fromisoformat(date_str).weekday()]
+
+async def fill_owner_names(tasks: list) -> list:
+    """Fill in missing owner_name fields with a single users query for the whole batch."""
+    uids = {t["user_id"] for t in tasks if not t.get("owner_name") and t.get("user_id")}
+    if not uids:
+        return tasks
+
+    users_map = {
+        u["uid"]: u.get("name", "Unknown")
+        async for u in get_db().users.find({"uid": {"$in": list(uids)}}, {"_id": 0, "uid": 1, "name": 1})
+    }
+    for t in tasks:
+        if not t.get("owner_name") and t.get("user_id"):
+            t["owner_name"] = users_map.get(t["user_id"], "Unknown")
+    return tasks
 
 # --- Auth Routes ---
 
@@ -26,27 +92,32 @@ async def health_check():
     return {"status": "ok"}
 
 @router.post("/api/login")
-async def login(credentials: dict = Body(...)):
+async def login(credentials: LoginIn):
     """Authenticate user with email and password, return JWT token."""
-    email = credentials.get("email", "").strip().lower()
-    password = credentials.get("password", "").strip()
-    
-    if not email or not password:
-        raise HTTPException(status_code=400, detail="Email and password required")
+    email = credentials.email
+    password = credentials.password
     
-    # Find user in MongoDB
-    user = db.users.find_one({"email": email})
+    # Credentials are read straight from MongoDB; they are never cached
+    user = await get_db().users.find_one({"email": email}, LOGIN_PROJECTION)
     
     if not user:
-        logger.warning(f"Login failed: user not found - {email}")
+        logger.warning("Login failed: user not found - %s", email)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    # Check password (plain text comparison as per user preference)
-    stored_password = user.get("password", "")
-    if password != stored_password:
-        logger.warning(f"Login failed: wrong password - {email}")
+    # bcrypt is CPU-bound, keep it off the event loop
+    if not await run_in_threadpool(verify_password, password, user):
+        logger.warning("Login failed: wrong password - %s", email)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Upgrade legacy plain-text passwords to a hash on successful login; the filter
+    # only matches the password just verified, so a concurrent admin reset isn't overwritten
+    if not user.get("password_hash"):
+        password_hash = await run_in_threadpool(hash_password, password)
+        await get_db().users.update_one(
+            {"uid": user["uid"], "password": user.get("password"), "password_hash": {"$exists": False}},
+            {"$set": {"password_hash": password_hash}, "$unset": {"password": ""}}
+        )
+    
     # Generate JWT token
     token = create_token(
         uid=user["uid"],
@@ -54,7 +125,7 @@ async def login(credentials: dict = Body(...)):
         role=user.get("role", "user")
     )
     
-    logger.info(f"User logged in: {email}")
+    logger.info("User logged in: %s", email)
     return {
         "token": token,
         "uid": user["uid"],
@@ -78,25 +149,21 @@ async def get_today_task(
     target_date = date or get_today_str()
     uid = user["uid"]
     
-    task = db.tasks.find_one({"user_id": uid, "date": target_date}, {"_id": 0})
+    task = await get_db().tasks.find_one({"user_id": uid, "date": target_date}, TASK_PROJECTION)
     
     if task:
         return {"exists": True, "task": task}
     else:
-        # Task doesn't exist -> Check if User has persistent assignments
-        user_doc = db.users.find_one({"uid": uid})
-        default_task = None
-        
-        if user_doc:
-            # Construct a template task with persistent values
-            default_task = {
-                "date": target_date,
-                "assign_website": user_doc.get("assign_website", ""),
-                "task_assign_no": user_doc.get("task_assign_no", ""),
-                "other_tasks": user_doc.get("other_tasks", ""),
-                "status": "Not Started",
-                "total_pages_done": 0
-            }
+        # Task doesn't exist -> Construct a template task with the user's persistent assignments.
+        # The authenticated user doc already carries these fields, so no second lookup is needed.
+        default_task = {
+            "date": target_date,
+            "assign_website": user.get("assign_website", ""),
+            "task_assign_no": user.get("task_assign_no", ""),
+            "other_tasks": user.get("other_tasks", ""),
+            "status": "Not Started",
+            "total_pages_done": 0
+        }
             
         return {"exists": False, "task": default_task}
 
@@ -109,13 +176,13 @@ async def get_previous_task(
     target_date = before_date or get_today_str()
     uid = user["uid"]
     
-    task = db.tasks.find_one(
+    task = await get_db().tasks.find_one(
         {"user_id": uid, "date": {"$lt": target_date}},
+        TASK_PROJECTION,
         sort=[("date", -1)]
     )
     
     if task:
-        if "_id" in task: del task["_id"]
         return {"exists": True, "task": task}
     else:
         return {"exists": False, "task": None}
@@ -123,36 +190,27 @@ async def get_previous_task(
 @router.post("/api/tasks/save")
 async def save_task(task_data: TaskSave, user: dict = Depends(require_user)):
     """Upsert task for today (or specific date)."""
+    now = datetime.now(timezone.utc)
     uid = user["uid"]
     today = get_today_str()
     
     target_date = task_data.date or today
     day_name = get_day_name(target_date)
     
-    update_doc = task_data.dict(exclude_unset=True)
-    if "date" in update_doc:
-        del update_doc["date"]
-        
-    update_doc["updated_at"] = datetime.utcnow()
+    update_doc = task_data.model_dump(exclude_unset=True, exclude={"date"})
+    update_doc["updated_at"] = now
     
     insert_doc = {
         "user_id": uid,
         "date": target_date,
         "owner_name": user.get("name") or user.get("email", "Unknown"),
         "planner": day_name,
-        "created_at": datetime.utcnow()
+        "created_at": now
     }
     
-    result = db.tasks.update_one(
-        {"user_id": uid, "date": target_date},
-        {
-            "$set": update_doc,
-            "$setOnInsert": insert_doc
-        },
-        upsert=True
-    )
+    await task_writes.submit({"user_id": uid, "date": target_date}, update_doc, insert_doc)
     
-    logger.info(f"Task saved for user {uid} on {target_date}.")
+    logger.info("Task saved for user %s on %s.", uid, target_date)
     return {"message": "Task saved"}
 
 @router.get("/api/tasks/history")
@@ -163,10 +221,10 @@ async def get_task_history(
     """Get task history for current user."""
     uid = user["uid"]
     
-    cursor = db.tasks.find({"user_id": uid}, {"_id": 0}).sort("date", -1).limit(limit)
-    tasks = list(cursor)
+    cursor = get_db().tasks.find({"user_id": uid}, TASK_PROJECTION).sort("date", -1).limit(limit)
+    tasks = await cursor.to_list(length=limit)
     
-    logger.info(f"Fetched {len(tasks)} history items for user {uid}")
+    logger.info("Fetched %d history items for user %s", len(tasks), uid)
     return tasks
 
 # --- Admin APIs ---
@@ -185,79 +243,75 @@ async def get_all_tasks(
     if user_uid:
         query["user_id"] = user_uid
         
-    cursor = db.tasks.find(query, {"_id": 0}).sort("date", -1).limit(limit)
-    tasks = list(cursor)
+    cursor = get_db().tasks.find(query, TASK_PROJECTION).sort("date", -1).limit(limit)
+    tasks = await cursor.to_list(length=limit)
+    await fill_owner_names(tasks)
     
-    logger.info(f"Admin {admin['uid']} fetched {len(tasks)} tasks")
+    logger.info("Admin %s fetched %d tasks", admin['uid'], len(tasks))
     return tasks
 
 @router.put("/api/admin/task/{user_id}/{date}")
 async def admin_update_task(
     user_id: str,
     date: str,
-    task_update: dict = Body(...),
+    task_data: AdminTaskUpdateIn,
     admin: dict = Depends(require_admin)
 ):
     """Admin: Update (or create) any task by user_id and date."""
-    task_update["updated_at"] = datetime.utcnow()
+    now = datetime.now(timezone.utc)
+    task_update = task_data.model_dump(exclude_unset=True)
+    task_update["updated_at"] = now
     
-    # Try to update first
-    result = db.tasks.update_one(
+    # Try to update first, getting the updated task back in the same round trip
+    task = await get_db().tasks.find_one_and_update(
         {"user_id": user_id, "date": date},
-        {"$set": task_update}
+        {"$set": task_update},
+        projection=TASK_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
     
     # If no document matched, check if we should create one (Upsert logic)
-    if result.matched_count == 0:
+    created = task is None
+    if created:
         # Fetch user details to create a proper task document
-        user = db.users.find_one({"uid": user_id})
+        user = await get_user_cached(user_id)
         if not user:
              raise HTTPException(status_code=404, detail="User not found to assign task to")
              
         new_task = {
+            **NEW_TASK_DEFAULTS,
             "user_id": user_id,
             "date": date,
             "owner_name": user.get("name", "Unknown"),
             "planner": f"Admin ({admin.get('name', 'Admin')})",
-            "status": "Not Started",
-            "assign_website": "",
-            "task_assign_no": "",
-            "other_tasks": "",
-            "task_updates": "",
-            "additional": "",
-            "note": "",
-            "total_pages_done": 0,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": now
         }
-        # Overlay the updates
-        new_task.update(task_update)
-        
-        db.tasks.insert_one(new_task)
-        
-        # PERSISTENCE: Save assignments to User profile as well
-        user_updates = {}
-        if "assign_website" in task_update: user_updates["assign_website"] = task_update["assign_website"]
-        if "task_assign_no" in task_update: user_updates["task_assign_no"] = task_update["task_assign_no"]
-        if "other_tasks" in task_update: user_updates["other_tasks"] = task_update["other_tasks"]
+        # The updates win over the defaults ($set and $setOnInsert can't share a field)
+        set_on_insert = {k: v for k, v in new_task.items() if k not in task_update}
         
-        if user_updates:
-            db.users.update_one({"uid": user_id}, {"$set": user_updates})
-            
-        logger.info(f"Admin {admin['email']} created new task for {user['email']} on {date}")
-        return {"message": "Task created successfully"}
-    
-    # Update matched -> Also update User persistence
-    user_updates = {}
-    if "assign_website" in task_update: user_updates["assign_website"] = task_update["assign_website"]
-    if "task_assign_no" in task_update: user_updates["task_assign_no"] = task_update["task_assign_no"]
-    if "other_tasks" in task_update: user_updates["other_tasks"] = task_update["other_tasks"]
-    
+        # Upsert rather than insert, so a concurrent create of the same task can't conflict
+        task = await get_db().tasks.find_one_and_update(
+            {"user_id": user_id, "date": date},
+            {"$set": task_update, "$setOnInsert": set_on_insert},
+            projection=TASK_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    # PERSISTENCE: Save assignments to User profile as well
+    user_updates = {k: task_update[k] for k in PERSIST_FIELDS if k in task_update}
     if user_updates:
-        db.users.update_one({"uid": user_id}, {"$set": user_updates})
+        # Invalidate on both sides of the write so an in-flight read can't re-cache the old doc
+        await invalidate_user(user_id)
+        await get_db().users.update_one({"uid": user_id}, {"$set": user_updates})
+        await invalidate_user(user_id)
+    
+    if created:
+        logger.info("Admin %s created new task for %s on %s", admin['email'], user['email'], date)
+        return {"message": "Task created successfully", "task": task}
         
-    logger.info(f"Admin {admin['email']} updated task for user {user_id} on {date}")
-    return {"message": "Task updated successfully"}
+    logger.info("Admin %s updated task for user %s on %s", admin['email'], user_id, date)
+    return {"message": "Task updated successfully", "task": task}
 
 @router.delete("/api/admin/task/{user_id}/{date}")
 async def admin_delete_task(
@@ -266,27 +320,30 @@ async def admin_delete_task(
     admin: dict = Depends(require_admin)
 ):
     """Admin: Delete task."""
-    result = db.tasks.delete_one({"user_id": user_id, "date": date})
+    # Returns the deleted task in the same round trip, for logging or cache busting
+    deleted = await get_db().tasks.find_one_and_delete(
+        {"user_id": user_id, "date": date},
+        projection=TASK_PROJECTION
+    )
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    
+    logger.info("Admin %s deleted task for user %s on %s", admin['uid'], user_id, date)
 
 # --- User Creation (Admin Only) ---
 @router.post("/api/admin/create-user")
 async def create_user(
-    user_data: dict = Body(...),
+    user_data: CreateUserIn,
     admin: dict = Depends(require_admin)
 ):
     """Create a new user in MongoDB."""
-    email = user_data.get("email", "").strip().lower()
-    password = user_data.get("password", "").strip()
-    name = user_data.get("name", "").strip()
-    
-    if not email or not password or not name:
-        raise HTTPException(status_code=400, detail="Missing fields")
+    email = user_data.email
+    password = user_data.password
+    name = user_data.name
     
     # Check if user already exists
-    existing = db.users.find_one({"email": email})
+    existing = await get_db().users.find_one({"email": email}, {"_id": 1})
     if existing:
         raise HTTPException(status_code=400, detail="User with this email already exists")
     
@@ -297,111 +354,183 @@ async def create_user(
         "uid": uid,
         "email": email,
         "name": name,
-        "password": password,  # Plain text as per admin preference
+        "password_hash": await run_in_threadpool(hash_password, password),
         "role": "user",
-        "created_at": datetime.utcnow(),
+        "created_at": datetime.now(timezone.utc),
         "is_active": True
     }
     
-    db.users.insert_one(new_user)
+    try:
+        await get_db().users.insert_one(new_user)
+    except DuplicateKeyError:
+        # A concurrent create for the same email won the race past the check above
+        raise HTTPException(status_code=400, detail="User with this email already exists")
+    # A brand-new uid has nothing cached yet; only the users list is now out of date
+    await invalidate_users_snapshot()
     
-    logger.info(f"Admin {admin['uid']} created new user {email} ({uid})")
+    logger.info("Admin %s created new user %s (%s)", admin['uid'], email, uid)
     return {"message": "User created successfully", "uid": uid}
 
 @router.get("/api/admin/users")
 async def get_all_users(admin: dict = Depends(require_admin)):
     """Get all users (excluding admins)."""
-    users = list(db.users.find({"role": {"$ne": "admin"}}, {"_id": 0}))
-    return users
+    # Served as pre-serialized JSON; the snapshot is dropped whenever a user changes
+    payload = await get_users_snapshot()
+    if payload is None:
+        users = await get_db().users.find(
+            {"role": {"$ne": "admin"}},
+            {"_id": 0, "password": 0, "password_hash": 0}
+        ).to_list(length=None)
+        payload = orjson.dumps(users)
+        await set_users_snapshot(payload)
+    return Response(content=payload, media_type="application/json")
 
 @router.delete("/api/admin/user/{uid}")
 async def delete_user(uid: str, admin: dict = Depends(require_admin)):
     """Delete a user from MongoDB."""
     try:
-        # Delete from MongoDB
-        result = db.users.delete_one({"uid": uid})
+        # Delete from MongoDB, invalidating on both sides so an in-flight read can't re-cache the user
+        await invalidate_user(uid)
+        result = await get_db().users.delete_one({"uid": uid})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
-        logger.info(f"Admin {admin['uid']} deleted user {uid}")
+        await invalidate_user(uid)
+        logger.info("Admin %s deleted user %s", admin['uid'], uid)
         return {"message": "User deleted successfully"}
         
     except Exception as e:
-        logger.error(f"Failed to delete user {uid}: {e}")
+        logger.error("Failed to delete user %s: %s", uid, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/api/admin/user/{uid}/password")
 async def admin_reset_password(
     uid: str, 
-    password_data: dict = Body(...), 
+    password_data: ResetPasswordIn, 
     admin: dict = Depends(require_admin)
 ):
     """Admin: Reset user password."""
-    new_password = password_data.get("password")
-    if not new_password or len(new_password) < 6:
-        raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
+    new_password = password_data.password
         
-    result = db.users.update_one(
+    password_hash = await run_in_threadpool(hash_password, new_password)
+    await invalidate_user(uid)
+    result = await get_db().users.update_one(
         {"uid": uid},
-        {"$set": {"password": new_password}}
+        {"$set": {"password_hash": password_hash}, "$unset": {"password": ""}}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    
+    await invalidate_user(uid)
         
-    logger.info(f"Admin {admin['uid']} reset password for user {uid}")
+    logger.info("Admin %s reset password for user %s", admin['uid'], uid)
     return {"message": "Password updated successfully"}
 
 
 # --- Export APIs ---
 
-import pandas as pd
-from io import BytesIO
+import csv
+import io
+import xlsxwriter
+from tempfile import SpooledTemporaryFile
+from fastapi import Request
 from fastapi.responses import StreamingResponse
 
+EXPORT_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_COLUMNS = (
+    "date", "owner_name", "user_id", "status",
+    "total_pages_done", "assign_website", "task_updates",
+    "planner", "task_assign_no", "other_tasks", "additional", "note"
+)
+EXPORT_PROJECTION = {"_id": 0, **{col: 1 for col in EXPORT_COLUMNS}}
+
+async def iter_file_chunks(file, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield a file in chunks and close it once fully sent."""
+    try:
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+async def iter_tasks_csv(first_batch: list, cursor):
+    """Yield CSV text for the export: header, the already-fetched first batch, then the rest of the cursor."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def rows_to_csv(rows) -> str:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        return buf.getvalue()
+
+    yield rows_to_csv([EXPORT_COLUMNS])
+    batch = first_batch
+    while batch:
+        await fill_owner_names(batch)
+        yield rows_to_csv([doc.get(col, "") for col in EXPORT_COLUMNS] for doc in batch)
+        batch = await cursor.to_list(length=EXPORT_BATCH_SIZE)
+
 @router.get("/api/admin/export/tasks")
 async def export_tasks(
+    request: Request,
     date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format"),
     admin: dict = Depends(require_admin)
 ):
-    """Export tasks to Excel. If date provided, filter by date."""
+    """Export tasks to Excel (or CSV with 'Accept: text/csv'). If date provided, filter by date."""
     
     query = {}
     if date:
         query["date"] = date
-        filename = f"tasks_{date}.xlsx"
+        filename = f"tasks_{date}"
     else:
-        filename = f"tasks_all_{get_today_str()}.xlsx"
-    
-    cursor = db.tasks.find(query, {"_id": 0}).sort("date", -1)
-    tasks = list(cursor)
-    
-    if not tasks:
-        raise HTTPException(status_code=404, detail="No tasks found")
-        
-    df = pd.DataFrame(tasks)
-    
-    expected_cols = [
-        "date", "owner_name", "user_id", "status", 
-        "total_pages_done", "assign_website", "task_updates",
-        "planner", "task_assign_no", "other_tasks", "additional", "note"
-    ]
-    
-    for col in expected_cols:
-        if col not in df.columns:
-            df[col] = ""
-            
-    df = df[expected_cols]
-    
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name="Tasks")
+        filename = f"tasks_all_{get_today_str()}"
+    
+    # CSV is streamed straight from the cursor, skipping workbook generation entirely
+    if "text/csv" in request.headers.get("accept", ""):
+        cursor = get_db().tasks.find(query, EXPORT_PROJECTION).sort("date", -1)
+        first_batch = await cursor.to_list(length=EXPORT_BATCH_SIZE)
+        if not first_batch:
+            raise HTTPException(status_code=404, detail="No tasks found")
         
-    output.seek(0)
+        headers = {
+            'Content-Disposition': f'attachment; filename="{filename}.csv"'
+        }
+        return StreamingResponse(iter_tasks_csv(first_batch, cursor), headers=headers, media_type='text/csv')
+    
+    # Write rows straight from the cursor; constant_memory flushes each row to disk
+    # Spills to a temp file past EXPORT_SPOOL_MAX_SIZE so large exports don't sit in RAM
+    output = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    # strings_to_urls is off so long URLs or ones past the per-sheet hyperlink limit are kept as text
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "strings_to_urls": False})
+    worksheet = workbook.add_worksheet("Tasks")
+    worksheet.write_row(0, 0, EXPORT_COLUMNS)
+    
+    row = 0
+    cursor = get_db().tasks.find(query, EXPORT_PROJECTION).sort("date", -1)
+    while batch := await cursor.to_list(length=EXPORT_BATCH_SIZE):
+        await fill_owner_names(batch)
+        for doc in batch:
+            row += 1
+            # Cells are written one by one: write_row stops at the first failing cell
+            # and silently drops the rest of the row
+            for col, name in enumerate(EXPORT_COLUMNS):
+                if worksheet.write(row, col, doc.get(name, "")) < 0:
+                    logger.warning("XLSX export: could not fully write %s in row %d", name, row)
+    
+    workbook.close()
+    
+    if row == 0:
+        output.close()
+        raise HTTPException(status_code=404, detail="No tasks found")
     
     headers = {
-        'Content-Disposition': f'attachment; filename="{filename}"'
+        'Content-Disposition': f'attachment; filename="{filename}.xlsx"'
     }
     
-    return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(iter_file_chunks(output), headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Any
+from pydantic import BaseModel, ConfigDict, Field, constr, field_validator
+from typing import Optional
 from datetime import datetime
 
 class TaskSave(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore", str_strip_whitespace=False)
+
     status: Optional[str] = Field("Not Started")
     assign_website: Optional[str] = ""
     task_assign_no: Optional[str] = ""
@@ -10,11 +12,21 @@ class TaskSave(BaseModel):
     task_updates: Optional[str] = ""
     additional: Optional[str] = ""
     note: Optional[str] = ""
-    note: Optional[str] = ""
     total_pages_done: Optional[int] = 0
-    date: Optional[str] = None # Support saving for specific dates
+    # Support saving for specific dates; strictly YYYY-MM-DD, since fromisoformat
+    # would also accept forms like "20240105" or "2024-W01-5"
+    date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+
+    @field_validator("date")
+    @classmethod
+    def _real_date(cls, v):
+        if v is not None:
+            datetime.strptime(v, "%Y-%m-%d")
+        return v
 
 class TaskResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
+
     user_id: str
     owner_name: Optional[str]
     date: str
@@ -26,10 +38,42 @@ class TaskResponse(BaseModel):
     task_updates: Optional[str]
     additional: Optional[str]
     note: Optional[str]
-    note: Optional[str]
     total_pages_done: Optional[int]
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
-    
-    class Config:
-        from_attributes = True
+
+def _normalize_email(v):
+    return v.strip().lower() if isinstance(v, str) else v
+
+class LoginIn(BaseModel):
+    # Not EmailStr: existing accounts may use addresses email-validator rejects (e.g. *.local)
+    email: constr(strip_whitespace=True, min_length=1)
+    password: constr(strip_whitespace=True, min_length=1)
+
+    _lower_email = field_validator("email", mode="before")(_normalize_email)
+
+class CreateUserIn(BaseModel):
+    # Same rule as LoginIn, so admins can create accounts like a@company.local
+    email: constr(strip_whitespace=True, min_length=1)
+    password: constr(strip_whitespace=True, min_length=1)
+    name: constr(strip_whitespace=True, min_length=1)
+
+    _lower_email = field_validator("email", mode="before")(_normalize_email)
+
+class ResetPasswordIn(BaseModel):
+    password: constr(min_length=6)
+
+class AdminTaskUpdateIn(BaseModel):
+    # Known task fields are validated; anything else is passed through as before
+    model_config = ConfigDict(extra="allow")
+
+    owner_name: Optional[str] = None
+    planner: Optional[str] = None
+    status: Optional[str] = None
+    assign_website: Optional[str] = None
+    task_assign_no: Optional[str] = None
+    other_tasks: Optional[str] = None
+    task_updates: Optional[str] = None
+    additional: Optional[str] = None
+    note: Optional[str] = None
+    total_pages_done: Optional[int] = None
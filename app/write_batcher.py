@@ -0,0 +1,81 @@
+import asyncio
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, WriteError
+from .logger import logger
+
+class WriteBatcher:
+    """
+    Coalesces concurrent upserts on one collection into unordered bulk_write calls.
+
+    Callers await submit() and get the outcome of their own write; a single worker
+    task collects up to max_batch ops (or whatever arrives within max_delay seconds)
+    and sends them to MongoDB in one round trip.
+    """
+
+    def __init__(self, get_collection, max_batch: int = 64, max_delay: float = 0.005):
+        self._get_collection = get_collection
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue = None
+        self._worker = None
+        self._carry = None
+
+    async def submit(self, filter: dict, set_doc: dict, set_on_insert: dict):
+        """Queue an upsert and wait until its batch has been written."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        op = UpdateOne(filter, {"$set": set_doc, "$setOnInsert": set_on_insert}, upsert=True)
+        await self._queue.put((op, tuple(sorted(filter.items())), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = self._carry or await self._queue.get()
+            self._carry = None
+            batch = [item]
+            keys = {item[1]}
+            deadline = loop.time() + self._max_delay
+
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                # Unordered bulk writes don't keep submission order, so a second write
+                # to the same document waits for the next batch
+                if item[1] in keys:
+                    self._carry = item
+                    break
+                batch.append(item)
+                keys.add(item[1])
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        errors = {}
+        try:
+            await self._get_collection().bulk_write([op for op, _, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        except Exception as e:
+            logger.error("Batched write of %d ops failed: %s", len(batch), e)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            if i in errors:
+                err = errors[i]
+                future.set_exception(WriteError(err.get("errmsg"), err.get("code"), err))
+            else:
+                future.set_result(None)